@@ -18,13 +18,14 @@ Usage:
 
 Options:
   -l, --lookup-cmd                  looking up a CLI command.
+  -b, --batch=<file>                look up a command for each line of a file.
   -q, --sql-query                   generate SQL query.
   -u, --random-useragent            generate a random user-agent
   -i, --get-ip                      get your public IP address.
   -p, --random-password             generate a random password.
   -c, --color-code                  get a color Hex code.
   -a, --lookup-http-code            lookup HTTP Code by code number.
-  -z, --port-lookup                 lookup any port number.
+  -z, --port-lookup                 lookup one or more port numbers.
   -k, --set-key                     set or update ChatGPT API key.
   -o, --get-key                     display ChatGPT API key.
   -g, --get-cmd                     display the last command.
@@ -35,12 +36,12 @@ Options:
   -r, --clear-history               clear all history records.
   -s, --db-size                     display the database size.
   -n, --no-copy                     disable copy feature.
+  -N, --no-cache                    always ask ChatGPT, skipping cached answers.
   -h, --help                        display this screen.
   -v, --version                     display ChatCMD version.
   -x, --library-info                display library information.
 """
 
-import openai
 from docopt import docopt
 from chatcmd.helpers import Helpers
 from chatcmd.lookup import Lookup
@@ -50,7 +51,6 @@ from chatcmd.features import Features
 
 import os
 import sqlite3
-import importlib.metadata
 
 lookup = Lookup()
 api = API()
@@ -63,26 +63,28 @@ class ChatCMD:
     def __init__(self):
         self.args = docopt(__doc__)
         self.no_copy = False
+        self.no_cache = self.args['--no-cache']
 
         self.BASE_DIR = os.path.dirname(os.path.dirname(__file__))
         self.db_path = os.path.join(self.BASE_DIR, "chatcmd/db.sqlite")
         self.conn = sqlite3.connect(self.db_path)
+        cmd.setup_db(self.conn)
         self.cursor = self.conn.cursor()
 
     def cmd(self):
         try:
-            helpers.get_latest_version_from_pypi()
+            version_check = helpers.start_version_check(self.cursor)
             api_key = api.get_api_key(self, self.conn, self.cursor)
 
             if api_key is None:
                 api_key = api.ask_for_api_key(self, self.conn, self.cursor)
 
-            openai.api_key = api_key
-
             if self.args['--lookup-cmd']:
-                lookup.prompt(self.conn, self.cursor, api_key, False)
+                lookup.prompt(self.conn, self.cursor, api_key, False, self.no_cache)
+            elif self.args['--batch']:
+                lookup.prompt_batch(self.conn, self.cursor, api_key, self.args['--batch'], self.no_cache)
             elif self.args['--sql-query']:
-                lookup.prompt_sql(self.conn, self.cursor, api_key, False)
+                lookup.prompt_sql(self.conn, self.cursor, api_key, False, self.no_cache)
             elif self.args['--get-ip']:
                 features.get_public_ip_address()
             elif self.args['--random-useragent']:
@@ -90,7 +92,7 @@ class ChatCMD:
             elif self.args['--random-password']:
                 features.generate_random_password()
             elif self.args['--color-code']:
-                lookup.prompt_color(self.conn, self.cursor, api_key, False)
+                lookup.prompt_color(self.conn, self.cursor, api_key, False, self.no_cache)
             elif self.args['--lookup-http-code']:
                 features.lookup_http_code()
             elif self.args['--port-lookup']:
@@ -116,13 +118,15 @@ class ChatCMD:
             elif self.args['--library-info']:
                 helpers.library_info(self)
             elif self.args['--no-copy']:
-                lookup.prompt(self.conn, self.cursor, api_key, True)
+                lookup.prompt(self.conn, self.cursor, api_key, True, self.no_cache)
             elif self.args['--version']:
-                print('ChatCMD ' + importlib.metadata.version('chatcmd'))
+                print('ChatCMD ' + helpers.get_installed_version())
             else:
                 print(__doc__)
                 exit(0)
 
+            helpers.finish_version_check(self.conn, self.cursor, version_check)
+
             self.cursor.close()
             self.conn.close()
 
@@ -9,12 +9,6 @@ class API:
     @staticmethod
     def get_api_key(self, conn, cursor):
         try:
-            cursor.execute('CREATE TABLE IF NOT EXISTS config (id INTEGER PRIMARY KEY, api_key TEXT)')
-            conn.commit()
-
-            cursor.execute('INSERT OR IGNORE INTO config (id, api_key) VALUES(?,?)', [1, None])
-            conn.commit()
-
             cursor.execute("SELECT api_key FROM config WHERE id = 1")
             api_key = cursor.fetchone()
             if api_key[0] is not None:
@@ -2,23 +2,69 @@ import sqlite3
 import datetime
 import os
 
+# Cached responses older than this many seconds are ignored and regenerated.
+CACHE_TTL = 60 * 60
+# The cache keeps at most this many of the newest responses.
+CACHE_MAX_ENTRIES = 1000
+# Keys looked up per SELECT, below SQLite's default limit of 999 parameters.
+CACHE_LOOKUP_CHUNK = 500
+
+# Applied to every connection: WAL lets readers run alongside a write and,
+# with synchronous=NORMAL, commits no longer sync the main database file.
+DB_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-64000",
+    "mmap_size=268435456",
+    "wal_autocheckpoint=1000",
+)
+
+DB_SCHEMA = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS config (id INTEGER PRIMARY KEY, api_key TEXT);
+INSERT OR IGNORE INTO config (id, api_key) VALUES (1, NULL);
+CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, prompt TEXT, command TEXT, created_at DATETIME);
+CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, prompt TEXT, response TEXT, created_at DATETIME,
+                                  hits INTEGER DEFAULT 0);
+CREATE TABLE IF NOT EXISTS version_check (id INTEGER PRIMARY KEY, checked_at INTEGER);
+COMMIT;
+"""
+
 
 class CMD:
 
     @staticmethod
-    def add_cmd(conn, cursor, prompt, command):
+    def setup_db(conn):
         try:
-            cursor.execute(
-                "CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, "
-                "prompt TEXT, command TEXT, created_at DATETIME)")
-            conn.commit()
+            for pragma in DB_PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}")
+            conn.executescript(DB_SCHEMA)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error 1002: Failed to connect to database: {e}")
+        return False
+
+    @staticmethod
+    def record_prompt_result(conn, cursor, prompt, command, cache_key):
+        return CMD.record_prompt_results(conn, cursor, [(prompt, command, cache_key)])
 
-            cursor.execute("INSERT INTO history (prompt,command,created_at) VALUES(?,?,?)",
-                           (prompt, command, datetime.datetime.now()))
+    @staticmethod
+    def record_prompt_results(conn, cursor, results):
+        try:
+            now = datetime.datetime.now()
+            cursor.executemany("INSERT INTO history (prompt,command,created_at) VALUES(?,?,?)",
+                               [(prompt, command, now) for prompt, command, _ in results])
+            cursor.executemany("INSERT OR REPLACE INTO cache (key, prompt, response, created_at, hits) "
+                               "VALUES(?,?,?,?,?)",
+                               [(key, prompt, command, now, 0) for prompt, command, key in results
+                                if key is not None])
+            CMD.prune_cache(cursor, now)
             conn.commit()
 
             return True
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"Error 1012: Failed to add command to history: {e}")
         return False
 
@@ -42,13 +88,13 @@ class CMD:
             number = int(number)
             if number < 1:
                 print('History is empty.')
-            cursor.execute("SELECT prompt, command, created_at FROM history ORDER BY id DESC LIMIT ?", (number,))
+            cursor.execute("SELECT command FROM history ORDER BY id DESC LIMIT ?", (number,))
             total_commands = cursor.fetchall()
             if len(total_commands) > 0:
                 print('Latest Command:\n')
 
                 for command in total_commands:
-                    print(f'  - {command[1]}')
+                    print(f'  - {command[0]}')
             else:
                 print("History is empty.")
             return True
@@ -108,28 +154,69 @@ class CMD:
     @staticmethod
     def delete_last_num_cmd(conn, cursor, number):
         try:
-            cursor.execute('SELECT COUNT(*) FROM history')
-            count = cursor.fetchone()[0]
-
-            if count == 0:
-                print('History is empty.')
+            number = int(number)
+            if number < 1:
+                print('Please enter a correct number.')
             else:
-                number = int(number)
-                if number < 1:
-                    print('Please enter a correct number.')
+                cursor.execute("DELETE FROM history WHERE id IN "
+                               "(SELECT id FROM history ORDER BY id DESC LIMIT ?)", (number,))
+                conn.commit()
+
+                if cursor.rowcount > 0:
+                    print("Commands deleted successfully.")
                 else:
-                    select_query = f"SELECT * FROM history ORDER BY id DESC LIMIT {number}"
-                    cursor.execute(select_query)
-                    latest_records = cursor.fetchall()
-
-                    if latest_records:
-                        record_ids = [record[0] for record in latest_records]
-                        delete_query = f"DELETE FROM history WHERE id IN ({','.join(['?'] * len(record_ids))})"
-                        cursor.execute(delete_query, record_ids)
-                        conn.commit()
-                        print("Commands deleted successfully.")
+                    print('History is empty.')
         except sqlite3.Error as e:
             print(f"Error 1016: Failed to get last command from history: {e}")
 
+    @staticmethod
+    def get_cached_response(conn, cursor, key):
+        return CMD.get_cached_responses(conn, cursor, [key])[0]
+
+    @staticmethod
+    def get_cached_responses(conn, cursor, keys):
+        responses = [None] * len(keys)
+        try:
+            expires = datetime.datetime.now() - datetime.timedelta(seconds=CACHE_TTL)
+            unique_keys = list(dict.fromkeys(keys))
+            found = {}
+            for i in range(0, len(unique_keys), CACHE_LOOKUP_CHUNK):
+                chunk = unique_keys[i:i + CACHE_LOOKUP_CHUNK]
+                cursor.execute(f"SELECT key, response FROM cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                               "AND created_at > ?", (*chunk, expires))
+                found.update(cursor.fetchall())
+            responses = [found.get(key) for key in keys]
+
+            # Hit counters for the whole lookup are written in one transaction.
+            hits = [(key,) for key, response in zip(keys, responses) if response is not None]
+            if hits:
+                cursor.executemany("UPDATE cache SET hits = hits + 1 WHERE key = ?", hits)
+                conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Error 1019: Failed to get cached response: {e}")
+        return responses
+
+    @staticmethod
+    def prune_cache(cursor, now):
+        # Runs inside the caller's write transaction, so it costs no extra commit.
+        expired = now - datetime.timedelta(seconds=CACHE_TTL)
+        cursor.execute("DELETE FROM cache WHERE created_at <= ? OR key NOT IN "
+                       "(SELECT key FROM cache ORDER BY created_at DESC LIMIT ?)", (expired, CACHE_MAX_ENTRIES))
+
+    @staticmethod
+    def add_cached_response(conn, cursor, key, prompt, response):
+        try:
+            now = datetime.datetime.now()
+            cursor.execute("INSERT OR REPLACE INTO cache (key, prompt, response, created_at, hits) VALUES(?,?,?,?,?)",
+                           (key, prompt, response, now, 0))
+            CMD.prune_cache(cursor, now)
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Error 1020: Failed to add response to cache: {e}")
+        return False
+
 
 commands = CMD()
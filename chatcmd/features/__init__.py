@@ -1,17 +1,87 @@
 import logging
 
-from fake_useragent import UserAgent
-import requests
-import pyperclip
+import queue
 import string
+import functools
 import secrets
+import ipaddress
+import threading
+from types import MappingProxyType
+from chatcmd.helpers import Helpers, BANNER_ART
+
+helpers = Helpers()
+
+BANNER_HTTP_CODE = BANNER_ART + "                            Lookup HTTP Code by code\n        \n"
+_BANNER_HTTP_CODE_B = BANNER_HTTP_CODE.encode('utf-8')
+
+# Services that reply with the caller's IP as plain text. All are asked at
+# once and the first valid answer is used.
+IP_LOOKUP_URLS = ("https://api.ipify.org", "https://checkip.amazonaws.com")
+# (connect, read) seconds for each of them.
+IP_LOOKUP_TIMEOUT = (2, 5)
+
+PASSWORD_CHARS = string.ascii_letters + string.digits + string.punctuation
+# Random bytes at or above this are dropped, so every character is equally likely.
+_PASSWORD_BYTE_LIMIT = 256 // len(PASSWORD_CHARS) * len(PASSWORD_CHARS)
+
+# Read-only, since every lookup shares it.
+HTTP_CODES = MappingProxyType({
+    '100': "Continue",
+    '101': "Switching Protocols",
+    '200': "OK",
+    '201': "Created",
+    '202': "Accepted",
+    '203': "Non-Authoritative Information",
+    '204': "No Content",
+    '205': "Reset Content",
+    '206': "Partial Content",
+    '300': "Multiple Choices",
+    '301': "Moved Permanently",
+    '302': "Found",
+    '303': "See Other",
+    '304': "Not Modified",
+    '305': "Use Proxy",
+    '307': "Temporary Redirect",
+    '400': "Bad Request",
+    '401': "Unauthorized",
+    '402': "Payment Required",
+    '403': "Forbidden",
+    '404': "Not Found",
+    '405': "Method Not Allowed",
+    '406': "Not Acceptable",
+    '407': "Proxy Authentication Required",
+    '408': "Request Timeout",
+    '409': "Conflict",
+    '410': "Gone",
+    '411': "Length Required",
+    '412': "Precondition Failed",
+    '413': "Payload Too Large",
+    '414': "URI Too Long",
+    '415': "Unsupported Media Type",
+    '416': "Range Not Satisfiable",
+    '417': "Expectation Failed",
+    '500': "Internal Server Error",
+    '501': "Not Implemented",
+    '502': "Bad Gateway",
+    '503': "Service Unavailable",
+    '504': "Gateway Timeout",
+    '505': "HTTP Version Not Supported"
+})
 
 
 class Features:
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_user_agent_db():
+        # fake_useragent loads its bundled browser dataset, so it is only
+        # imported, and the dataset parsed, once a user agent is asked for.
+        from fake_useragent import UserAgent
+        return UserAgent()
+
     @staticmethod
     def generate_user_agent(os=None, browser=None):
-        ua = UserAgent()
+        ua = Features.get_user_agent_db()
         if os == "linux":
             if browser == "firefox":
                 user_agent = ua.firefox
@@ -45,93 +115,63 @@ class Features:
             user_agent = ua.random
 
         print(user_agent)
+        import pyperclip
         pyperclip.copy(user_agent)
 
     @staticmethod
     def get_public_ip_address():
-        try:
-            # Use a reliable service to get your public IP address
-            response = requests.get("https://api.ipify.org?format=json")
-
-            # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                # Parse the JSON response to extract the IP address
-                ip_data = response.json()
-                public_ip = ip_data["ip"]
+        results = queue.Queue()
+        # Daemon threads, so a slow service does not hold up exiting once
+        # another has answered.
+        for url in IP_LOOKUP_URLS:
+            threading.Thread(target=Features.fetch_public_ip, args=(url, results), daemon=True).start()
+
+        error = None
+        for _ in IP_LOOKUP_URLS:
+            try:
+                public_ip, error = results.get(timeout=sum(IP_LOOKUP_TIMEOUT))
+            except queue.Empty:
+                error = "timed out"
+                break
+            if public_ip is not None:
                 print(public_ip)
+                import pyperclip
                 pyperclip.copy(public_ip)
+                return
 
-            else:
-                print("Unable to retrieve public IP address, please try again.")
-        except requests.RequestException as e:
-            print(f"An error occurred: {e}")
+        print(f"Unable to retrieve public IP address, please try again. ({error})")
+
+    @staticmethod
+    def fetch_public_ip(url, results):
+        # Every failure is reported, so get_public_ip is never left waiting
+        # on a thread that died.
+        try:
+            import requests
+            response = requests.get(url, timeout=IP_LOOKUP_TIMEOUT)
+            response.raise_for_status()
+            results.put((str(ipaddress.ip_address(response.text.strip())), None))
+        except Exception as e:
+            results.put((None, e))
 
     @staticmethod
     def generate_random_password():
         length = 16
-        password = ''.join(secrets.choice(string.ascii_letters + string.digits + string.punctuation)
-                           for _ in range(length))
+        chars = []
+        while len(chars) < length:
+            # One read from the OS random source covers the whole password.
+            chars.extend(PASSWORD_CHARS[byte % len(PASSWORD_CHARS)] for byte in secrets.token_bytes(length * 2)
+                         if byte < _PASSWORD_BYTE_LIMIT)
+        password = ''.join(chars[:length])
+        import pyperclip
         pyperclip.copy(password)
         print(password)
 
     @staticmethod
     def lookup_http_code():
-        print("""
-
-         ######  ##     ##    ###    ########  ######  ##     ## ########
-        ##    ## ##     ##   ## ##      ##    ##    ## ###   ### ##     ##
-        ##       ##     ##  ##   ##     ##    ##       #### #### ##     ##
-        ##       ######### ##     ##    ##    ##       ## ### ## ##     ##
-        ##       ##     ## #########    ##    ##       ##     ## ##     ##
-        ##    ## ##     ## ##     ##    ##    ##    ## ##     ## ##     ##
-         ######  ##     ## ##     ##    ##     ######  ##     ## ########
-                            Lookup HTTP Code by code
-        """)
-        code = input("HTTP Code: ")
-        http_codes = {
-            '100': "Continue",
-            '101': "Switching Protocols",
-            '200': "OK",
-            '201': "Created",
-            '202': "Accepted",
-            '203': "Non-Authoritative Information",
-            '204': "No Content",
-            '205': "Reset Content",
-            '206': "Partial Content",
-            '300': "Multiple Choices",
-            '301': "Moved Permanently",
-            '302': "Found",
-            '303': "See Other",
-            '304': "Not Modified",
-            '305': "Use Proxy",
-            '307': "Temporary Redirect",
-            '400': "Bad Request",
-            '401': "Unauthorized",
-            '402': "Payment Required",
-            '403': "Forbidden",
-            '404': "Not Found",
-            '405': "Method Not Allowed",
-            '406': "Not Acceptable",
-            '407': "Proxy Authentication Required",
-            '408': "Request Timeout",
-            '409': "Conflict",
-            '410': "Gone",
-            '411': "Length Required",
-            '412': "Precondition Failed",
-            '413': "Payload Too Large",
-            '414': "URI Too Long",
-            '415': "Unsupported Media Type",
-            '416': "Range Not Satisfiable",
-            '417': "Expectation Failed",
-            '500': "Internal Server Error",
-            '501': "Not Implemented",
-            '502': "Bad Gateway",
-            '503': "Service Unavailable",
-            '504': "Gateway Timeout",
-            '505': "HTTP Version Not Supported"
-        }
-        if code in http_codes:
-            print(http_codes[code])
+        helpers.write_banner(helpers, _BANNER_HTTP_CODE_B)
+        description = HTTP_CODES.get(input("HTTP Code: ").strip())
+        if description is not None:
+            print(description)
         else:
             print('Unknown HTTP Code')
 
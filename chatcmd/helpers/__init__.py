@@ -1,23 +1,93 @@
 import re
+import sys
+import time
+import sqlite3
+import threading
+import hashlib
 import inspect
+import functools
 import subprocess
-import requests
 import importlib.metadata
 
+BANNER_ART = """
+
+         ######  ##     ##    ###    ########  ######  ##     ## ########
+        ##    ## ##     ##   ## ##      ##    ##    ## ###   ### ##     ##
+        ##       ##     ##  ##   ##     ##    ##       #### #### ##     ##
+        ##       ######### ##     ##    ##    ##       ## ### ## ##     ##
+        ##       ##     ## #########    ##    ##       ##     ## ##     ##
+        ##    ## ##     ## ##     ##    ##    ##    ## ##     ## ##     ##
+         ######  ##     ## ##     ##    ##     ######  ##     ## ########
+"""
+
+# PyPI is asked for a newer release at most once per this many seconds.
+VERSION_CHECK_INTERVAL = 24 * 60 * 60
+VERSION_CHECK_TIMEOUT = 3
+VERSION_CHECK_CONNECT_TIMEOUT = 1
+
+# Characters allowed in a prompt, checked in one pass over the input.
+_INPUT_RE = re.compile(r'[A-Za-z0-9 _\-@$\.]+')
+# An OpenAI key: the "sk-" prefix followed by letters, digits and dashes.
+_API_KEY_RE = re.compile(r'sk-[a-zA-Z0-9-]*')
+
 
 class Helpers:
 
     @staticmethod
-    def get_latest_version_from_pypi():
-        response = requests.get(f"https://pypi.org/pypi/chatcmd/json")
-        data = response.json()
-        latest_version = data["info"]["version"]
-        installed_version = importlib.metadata.version('chatcmd')
+    @functools.lru_cache(maxsize=None)
+    def get_installed_version():
+        return importlib.metadata.version('chatcmd')
+
+    @staticmethod
+    def fetch_latest_version(latest):
+        # requests is imported here, off the main thread, and only on the
+        # runs that actually ask PyPI.
+        import requests
+        try:
+            response = requests.get("https://pypi.org/pypi/chatcmd/json",
+                                    timeout=(VERSION_CHECK_CONNECT_TIMEOUT, VERSION_CHECK_TIMEOUT))
+            latest.append(response.json()["info"]["version"])
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def start_version_check(cursor):
+        try:
+            cursor.execute("SELECT checked_at FROM version_check WHERE id = 1")
+            checked_at = cursor.fetchone()
+            if checked_at is not None and time.time() - checked_at[0] < VERSION_CHECK_INTERVAL:
+                return None
+        except sqlite3.Error:
+            pass
+
+        # Ask PyPI in the background while the command runs.
+        latest = []
+        thread = threading.Thread(target=helpers.fetch_latest_version, args=(latest,), daemon=True)
+        thread.start()
+        return thread, latest
+
+    @staticmethod
+    def finish_version_check(conn, cursor, version_check):
+        if version_check is None:
+            return
+
+        thread, latest = version_check
+        thread.join(VERSION_CHECK_TIMEOUT)
+        if not latest:
+            return
 
+        latest_version = latest[0]
+        installed_version = helpers.get_installed_version()
         if installed_version != latest_version:
             print(f"New version {latest_version} is available! You are currently using version {installed_version}.")
             print("Consider upgrading using: pip3 install --upgrade chatcmd")
 
+        try:
+            cursor.execute('INSERT OR REPLACE INTO version_check (id, checked_at) VALUES(?,?)', (1, int(time.time())))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
     @staticmethod
     def library_info(self):
         print(
@@ -42,28 +112,52 @@ class Helpers:
         except subprocess.CalledProcessError as e:
             print(f"Failed to copy command to clipboard. Find how to avoid this error in the documentation.")
 
+    @staticmethod
+    def write_banner(self, banner):
+        sys.stdout.flush()
+        sys.stdout.buffer.write(banner)
+        sys.stdout.flush()
+
     @staticmethod
     def clear_input(self, input):
         input = input.strip()
         return input
 
+    @staticmethod
+    def has_min_words(self, text, count):
+        words = 0
+        in_word = False
+        for char in text:
+            if char.isspace():
+                in_word = False
+            elif not in_word:
+                words += 1
+                if words >= count:
+                    return True
+                in_word = True
+        return words >= count
+
     @staticmethod
     def validate_input(self, prompt):
-        pattern = r'^[A-Za-z0-9 _\-@$\.]+$'
-        if re.match(pattern, str(prompt)):
+        if _INPUT_RE.fullmatch(str(prompt)):
             return True
 
         return False
 
     @staticmethod
     def validate_api_key(self, api_key):
-        if api_key[0:3] != 'sk-':
-            return False
         # if len(api_key) != 51:
         #     return False
-        if not re.match("^[a-zA-Z0-9-]+$", api_key):
-            return False
-        return True
+        return _API_KEY_RE.fullmatch(api_key) is not None
+
+    @staticmethod
+    def cache_key(self, model, mode, prompt):
+        # Only whitespace is collapsed: commands and SQL are case-sensitive, so
+        # the case of a prompt is kept except for colours.
+        normalized = ' '.join(prompt.split())
+        if mode == 'color':
+            normalized = normalized.casefold()
+        return hashlib.blake2b(f"{model}|{mode}|{normalized}".encode('utf-8'), digest_size=16).hexdigest()
 
     @staticmethod
     def get_line_number(self):
@@ -1,253 +1,478 @@
-from openai import OpenAI
-import pyperclip
+import re
+import sys
+import functools
+import threading
+import concurrent.futures
 import platform
 from chatcmd.commands import CMD
-from chatcmd.helpers import Helpers
+from chatcmd.helpers import Helpers, BANNER_ART
 
 cmd = CMD()
 helpers = Helpers()
 
+MODEL = "gpt-4o-mini"
+# Greedy sampling keeps replies deterministic, so a cached reply is the one
+# the API would have returned for the same prompt.
+TEMPERATURE = 0
+# Fixed sampling seed, so the same prompt gets the same reply across runs
+# as far as the API allows.
+SEED = 0
+
+_IS_LINUX = platform.system() == "Linux"
+
+
+def _pyperclip_copy(text):
+    # pyperclip loads its platform backends on import, so it is only imported
+    # when a copy actually goes through it.
+    import pyperclip
+    pyperclip.copy(text)
+
+
+# Chosen once for the platform instead of on every copy.
+_CLIPBOARD_FN = functools.partial(helpers.copy_to_clipboard, helpers) if _IS_LINUX else _pyperclip_copy
+
+# Longer prompts are refused locally rather than sent and billed; about 250
+# tokens, far more than any command description needs.
+MAX_PROMPT_CHARS = 1000
+
+# Seconds to wait on OpenAI. Each attempt to connect gives up after
+# CONNECT_TIMEOUT, and failed attempts are retried MAX_RETRIES times with the
+# SDK's short backoff, so an unreachable API fails after about
+# (MAX_RETRIES + 1) * CONNECT_TIMEOUT plus a second or two of backoff.
+# REQUEST_TIMEOUT bounds each read, write and pool wait separately, so a
+# stalled reply fails after it, while a slowly streaming one can take longer.
+CONNECT_TIMEOUT = 2
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 2
+
+# Number of lookups sent to OpenAI at the same time in batch mode.
+BATCH_CONCURRENCY = 8
+# Batch prompts asked for in a single request, sharing one system message.
+BATCH_GROUP_SIZE = 8
+
+# Clipboard writes run here so the result is printed without waiting on
+# xclip/pyperclip; pending copies are finished before the interpreter exits.
+_io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+
+def _report_copy_error(future):
+    # Copies run in the background, so their failures are reported here
+    # instead of being raised to the caller.
+    error = future.exception()
+    if error is not None:
+        print(f"Error 1018: Failed to copy command to clipboard: {error}")
+
+
+# OpenAI clients by API key, built once the key has been validated.
+_clients = {}
+
+# Openings of replies that explain there is no answer instead of giving one.
+# They are only matched at the start of a reply, so a command or query that
+# merely contains one of them (grep 'unable to') is still an answer.
+_REFUSAL_OPENERS = (
+    r"sorry|i'm sorry|i am sorry|i apologi[sz]e|apologies|unfortunately|as an ai|as a language model|"
+    r"i cannot|i can't|i can not|i'm unable|i am unable|i'm not able|i am not able|unable to|cannot|"
+    r"i don't know|i do not know|i'm not sure|i am not sure|there is no|there's no|there are no|no specific"
+)
+_INVALID_CMD_RE = re.compile(
+    rf"(?:{_REFUSAL_OPENERS}|not a command|no command exists|command not found)\b", re.IGNORECASE)
+_INVALID_SQL_RE = re.compile(rf"(?:{_REFUSAL_OPENERS}|not a query)\b", re.IGNORECASE)
+_INVALID_COLOR_RE = re.compile(rf"(?:{_REFUSAL_OPENERS}|not a color)\b", re.IGNORECASE)
+# One numbered answer per line in a grouped batch reply, e.g. "3. du -sh .".
+# Matching stays on one line, so an empty answer does not take in the next one.
+_BATCH_ANSWER_RE = re.compile(r'^[ \t]*(\d+)[.)][ \t]*(.*?)[ \t]*$', re.MULTILINE)
+# A number left at the start of a captured answer ("1. 2. ls"), which means
+# the answer itself is missing.
+_BATCH_NUMBER_RE = re.compile(r'\d+[.)]')
+# Characters of a streamed reply after which its opening is settled: longer
+# than any refusal opener above.
+_REFUSAL_PREFIX_CHARS = 32
+# Opening and closing markdown fences (``` or ```bash) some replies are
+# wrapped in despite the system message.
+_CODE_FENCE_RE = re.compile(r'```[\w+-]*')
+
+
+def is_invalid_response(response, invalid_re):
+    if not response:
+        return True
+    return invalid_re.match(response.lstrip()) is not None
+
+
+# System messages are kept constant so OpenAI can reuse the cached prompt
+# prefix across calls; only the short user message changes per request.
+# Every feature starts with the same preamble so the cached prefix is also
+# shared between features.
+SYSTEM_PREFIX = (
+    "You are ChatCMD, the assistant behind a command-line tool. Your reply is printed in a terminal "
+    "and copied to the clipboard as is, so reply with the answer only: no explanation, no markdown, "
+    "no code blocks and no surrounding quotes. Keep the answer on a single line.\n"
+)
+
+SYSTEM_LOOKUP = SYSTEM_PREFIX + (
+    "Task: reply with the single shell command that does what the user asks.\n"
+    "Examples:\n"
+    "list all files including hidden ones -> ls -la\n"
+    "show disk usage of current directory -> du -sh .\n"
+    "find all python files in current directory -> find . -name \"*.py\"\n"
+    "show running processes -> ps aux"
+)
+
+# Extends SYSTEM_LOOKUP so grouped batch requests share its cached prefix.
+SYSTEM_LOOKUP_BATCH = SYSTEM_LOOKUP + (
+    "\nThe user may send several numbered requests, one per line. Then reply with one line per request, "
+    "starting with its number, for example: 1. ls -la"
+)
+
+SYSTEM_SQL = SYSTEM_PREFIX + (
+    "Task: act as a database engineer and reply with the single SQL query that does what the user asks.\n"
+    "Examples:\n"
+    "select all users older than 30 -> SELECT * FROM users WHERE age > 30;\n"
+    "count orders per customer -> SELECT customer_id, COUNT(*) FROM orders GROUP BY customer_id;"
+)
+
+SYSTEM_COLOR = SYSTEM_PREFIX + (
+    "Task: reply with the HEX code of the color the user describes.\n"
+    "Examples:\n"
+    "pure red -> #FF0000\n"
+    "sky blue -> #87CEEB"
+)
+
+SYSTEM_PORT = SYSTEM_PREFIX + (
+    "Task: the user gives a port number, reply with the protocol or service that commonly uses it "
+    "in one short sentence.\n"
+    "Examples:\n"
+    "22 -> SSH (Secure Shell)\n"
+    "443 -> HTTPS (HTTP over TLS/SSL)"
+)
+
+BANNER_LOOKUP = BANNER_ART + "                            Lookup CLI Commands\n        \n"
+BANNER_SQL = BANNER_ART + "                            Write SQL Queries\n        \n"
+BANNER_COLOR = BANNER_ART + "                            Get Colors Hex code\n        \n"
+
+# Banners are encoded once at import and written straight to stdout.
+_BANNER_LOOKUP_B = BANNER_LOOKUP.encode('utf-8')
+_BANNER_SQL_B = BANNER_SQL.encode('utf-8')
+_BANNER_COLOR_B = BANNER_COLOR.encode('utf-8')
+
+# What differs between the interactive features; everything else is shared
+# by Lookup.run_generation.
+GEN_MODES = {
+    'cmd': {
+        'banner': _BANNER_LOOKUP_B,
+        'label': "Prompt: ",
+        'status': "Looking up...",
+        'system': SYSTEM_LOOKUP,
+        'max_tokens': 32,
+        'single_line': True,
+        'invalid': _INVALID_CMD_RE,
+        'no_answer': 'there is no command for this!',
+        'validate_input': False,
+        'min_words': 3,
+        'history': True,
+    },
+    'sql': {
+        'banner': _BANNER_SQL_B,
+        'label': "SQL Query Prompt: ",
+        'status': "Writing SQL query...",
+        'system': SYSTEM_SQL,
+        'max_tokens': 160,
+        'single_line': False,
+        'invalid': _INVALID_SQL_RE,
+        'no_answer': 'there is no query for this!',
+        'validate_input': True,
+        'min_words': 3,
+        'history': False,
+    },
+    'color': {
+        'banner': _BANNER_COLOR_B,
+        'label': "Color Prompt: ",
+        'status': "Getting color code...",
+        'system': SYSTEM_COLOR,
+        'max_tokens': 16,
+        'single_line': True,
+        'invalid': _INVALID_COLOR_RE,
+        'no_answer': 'there is no color for this!',
+        'validate_input': False,
+        'min_words': 1,
+        'history': False,
+    },
+}
 
-class Lookup:
-
-    def prompt(self, conn, cursor, api_key, no_copy):
-        print("""
-
-         ######  ##     ##    ###    ########  ######  ##     ## ########
-        ##    ## ##     ##   ## ##      ##    ##    ## ###   ### ##     ##
-        ##       ##     ##  ##   ##     ##    ##       #### #### ##     ##
-        ##       ######### ##     ##    ##    ##       ## ### ## ##     ##
-        ##       ##     ## #########    ##    ##       ##     ## ##     ##
-        ##    ## ##     ## ##     ##    ##    ##    ## ##     ## ##     ##
-         ######  ##     ## ##     ##    ##     ######  ##     ## ########
-                            Lookup CLI Commands
-        """)
-        if helpers.validate_api_key(self, api_key) is False:
-            print("Error 1009: API key is invalid or missing")
-        prompt = helpers.clear_input(self, input("Prompt: "))
 
-        if prompt == '':
-            prompt(conn, cursor, api_key)
-        if prompt == 'exit':
-            print('bye...')
-            exit()
-        else:
-            word_list = prompt.strip().split()
-            if len(word_list) >= 3:
-                command = self.lookup(self, prompt, api_key)
-                if command is not None:
-                    if not no_copy:
-                        if platform.system() == "Linux":
-                            helpers.copy_to_clipboard(self, command)
-                        else:
-                            pyperclip.copy(command)
-
-                    command = helpers.clear_input(self, command)
-
-                    if command.find('there is no command') is True and command.find(
-                            'There is no specific command') is True:
-                        print('there is no command for this!')
-                    else:
-                        history = cmd.add_cmd(conn, cursor, prompt, command.strip())
-                        if history is False:
-                            print("Error 1008 Failed to add command to history")
-                        print(" " + command.strip())
-                        print('')
-            else:
-                print("\nPlease type in more than two words.\n")
-
-    @staticmethod
-    def lookup(self, prompt, api_key):
-        try:
-            if helpers.validate_api_key(self, api_key) is False:
-                print("Error 1009: API key is invalid or missing")
-                exit()
+class Lookup:
 
-            prompt = prompt
-            print("Looking up...\n")
-
-            client = OpenAI(
-                # This is the default and can be omitted
-                api_key=api_key,
-            )
-            # stop_keywords = ["###", "END", "stop", "Command:", "Syntax:", "Usage:", "Windows is:", "is:"]
-            completion = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                # prompt=f"Please help me with a CLI command lookup, I only need the command without"
-                #        f" any extra information: Show me the command for {prompt}",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f" any extra information: Show me the command for {prompt}",
-                    }
-                ],
-                max_tokens=70,
-                n=1,
-                stop=None,
-                temperature=0.7)
-            message = completion.choices[0].message.content.strip()
-            return message
+    def prompt(self, conn, cursor, api_key, no_copy, no_cache=False):
+        self.run_generation(conn, cursor, api_key, no_copy, 'cmd', no_cache)
 
-        except Exception as e:
-            print(f"Error 1011: OpenAI API error occurred: {e}")
-
-    def prompt_sql(self, conn, cursor, api_key, no_copy):
-        print("""
-
-         ######  ##     ##    ###    ########  ######  ##     ## ########
-        ##    ## ##     ##   ## ##      ##    ##    ## ###   ### ##     ##
-        ##       ##     ##  ##   ##     ##    ##       #### #### ##     ##
-        ##       ######### ##     ##    ##    ##       ## ### ## ##     ##
-        ##       ##     ## #########    ##    ##       ##     ## ##     ##
-        ##    ## ##     ## ##     ##    ##    ##    ## ##     ## ##     ##
-         ######  ##     ## ##     ##    ##     ######  ##     ## ########
-                            Write SQL Queries
-        """)
-        if helpers.validate_api_key(self, api_key) is False:
+    def run_generation(self, conn, cursor, api_key, no_copy, mode, no_cache=False):
+        settings = GEN_MODES[mode]
+        helpers.write_banner(self, settings['banner'])
+        # No warm-up request here: whether the prompt is sent at all is only
+        # known once the cache has been checked.
+        if self.resolve_client(self, api_key) is None:
             print("Error 1009: API key is invalid or missing")
-        prompt = helpers.clear_input(self, input("SQL Query Prompt: "))
 
-        if prompt == '':
-            prompt(conn, cursor, api_key)
+        while True:
+            prompt = helpers.clear_input(self, input(settings['label']))
+            if prompt != '':
+                break
+
         if prompt == 'exit':
             print('bye...')
-            exit()
-        elif helpers.validate_input(self, prompt.strip()):
-            word_list = prompt.strip().split()
-            if len(word_list) >= 3:
-                response = self.sql_query(self, prompt, api_key)
-                if response is not None:
-                    if not no_copy:
-                        if platform.system() == "Linux":
-                            helpers.copy_to_clipboard(self, response)
-                        else:
-                            pyperclip.copy(response)
-
-                    response_text = helpers.clear_input(self, response)
-
-                    if response_text.find('there is no query') is True and response_text.find(
-                            'There is no specific query') is True:
-                        print('there is no query for this!')
-                    else:
-                        print(" " + response_text.strip())
-                        print('')
-
-            else:
-                print("\nPlease type in more than two words.\n")
+            return
+        if settings['validate_input'] and not helpers.validate_input(self, prompt):
+            return
+        if not helpers.has_min_words(self, prompt, settings['min_words']):
+            print("\nPlease type in more than two words.\n")
+            return
+        if len(prompt) > MAX_PROMPT_CHARS:
+            print(f"\nPlease keep the prompt under {MAX_PROMPT_CHARS} characters.\n")
+            return
+
+        key = None if no_cache else helpers.cache_key(self, MODEL, mode, prompt)
+        cached = None if no_cache else cmd.get_cached_response(conn, cursor, key)
+        response = cached if cached is not None else self.generate(self, prompt, api_key, mode)
+        if response is None:
+            return
+
+        # complete() strips and screens the reply while it streams, and only
+        # screened replies are cached, so a cache hit needs no second pass.
+        if cached is None and is_invalid_response(response, settings['invalid']):
+            print(settings['no_answer'])
+            return
+
+        if not no_copy:
+            _io_pool.submit(_CLIPBOARD_FN, response).add_done_callback(_report_copy_error)
+
+        new_key = key if cached is None else None
+        if settings['history']:
+            if cmd.record_prompt_result(conn, cursor, prompt, response, new_key) is False:
+                print("Error 1008 Failed to add command to history")
+        elif new_key is not None:
+            cmd.add_cached_response(conn, cursor, new_key, prompt, response)
+
+        sys.stdout.write(" " + response + "\n\n")
 
     @staticmethod
-    def sql_query(self, prompt, api_key):
+    def generate(self, prompt, api_key, mode):
+        import openai
+        settings = GEN_MODES[mode]
         try:
-            if helpers.validate_api_key(self, api_key) is False:
+            client = self.resolve_client(self, api_key)
+            if client is None:
                 print("Error 1009: API key is invalid or missing")
                 exit()
 
-            prompt = prompt
-            print("Writing SQL query...\n")
-
-            response = openai.Completion.create(
-                engine='text-davinci-003',
-                prompt=f"Act like a database engineer and write a query that {prompt}",
-                max_tokens=70,
-                n=1,
-                stop=None,
-                temperature=0.7)
-            response = response.choices[0].text.strip()
+            print(settings['status'] + "\n")
+            response = self.complete(self, client, settings['system'], prompt, settings['max_tokens'],
+                                     settings['invalid'], settings['single_line'])
+            if response is None:
+                print("Error 1022: The reply was cut off at the token limit, try a shorter prompt.")
             return response
 
-        except openai.error.OpenAIError as e:
+        except openai.OpenAIError as e:
             print(f"Error 1010: OpenAI API error occurred: {e}. Please double check your API Key.")
         except Exception as e:
             print(f"Error 1011: Unhandled exception occurred: {e}")
 
-    def prompt_color(self, conn, cursor, api_key, no_copy):
-        print("""
-
-         ######  ##     ##    ###    ########  ######  ##     ## ########
-        ##    ## ##     ##   ## ##      ##    ##    ## ###   ### ##     ##
-        ##       ##     ##  ##   ##     ##    ##       #### #### ##     ##
-        ##       ######### ##     ##    ##    ##       ## ### ## ##     ##
-        ##       ##     ## #########    ##    ##       ##     ## ##     ##
-        ##    ## ##     ## ##     ##    ##    ##    ## ##     ## ##     ##
-         ######  ##     ## ##     ##    ##     ######  ##     ## ########
-                            Get Colors Hex code
-        """)
-        if helpers.validate_api_key(self, api_key) is False:
+    def prompt_batch(self, conn, cursor, api_key, prompts_file, no_cache=False):
+        client = self.resolve_client(self, api_key)
+        if client is None:
             print("Error 1009: API key is invalid or missing")
-        prompt = helpers.clear_input(self, input("Color Prompt: "))
+            return
 
-        if prompt == '':
-            prompt(conn, cursor, api_key)
-        if prompt == 'exit':
-            print('bye...')
-            exit()
-        else:
-            response = self.color_query(self, prompt, api_key)
-            if response is not None:
-                if not no_copy:
-                    if platform.system() == "Linux":
-                        helpers.copy_to_clipboard(self, response)
-                    else:
-                        pyperclip.copy(response)
-
-                response = helpers.clear_input(self, response)
-
-                if response.find('there is no color') is True and response.find(
-                        'There is no specific color') is True:
-                    print('there is no color for this!')
-                else:
-                    print(" " + response.strip())
-                    print('')
+        try:
+            with open(prompts_file) as f:
+                prompts = [helpers.clear_input(self, line) for line in f]
+        except OSError as e:
+            print(f"Error 1021: Failed to read prompts file: {e}")
+            return
+
+        prompts = [prompt for prompt in prompts if prompt]
+        # Prompts that are not sent are still listed in the output, with the reason.
+        skipped = ['too short' if not helpers.has_min_words(self, prompt, 3) else
+                   'too long' if len(prompt) > MAX_PROMPT_CHARS else None for prompt in prompts]
+        keys = [None if reason else helpers.cache_key(self, MODEL, 'cmd', prompt)
+                for prompt, reason in zip(prompts, skipped)]
+        sent_keys = [key for key in keys if key is not None]
+        cached = dict(zip(sent_keys, [None] * len(sent_keys) if no_cache else
+                          cmd.get_cached_responses(conn, cursor, sent_keys)))
+        # Prompts with the same key are asked for once and share the answer.
+        misses = {}
+        for prompt, key in zip(prompts, keys):
+            if key is not None and cached[key] is None:
+                misses.setdefault(key, prompt)
+        missed = list(misses.values())
+
+        print(f"Looking up {len(missed)} of {len(prompts)} commands...\n")
+        groups = [missed[i:i + BATCH_GROUP_SIZE] for i in range(0, len(missed), BATCH_GROUP_SIZE)]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+            replies = list(pool.map(lambda group: self.batch_lookup_group(self, client, group), groups))
+        fetched = dict(zip(misses, [command for reply in replies for command in reply]))
+
+        results = []
+        output = []
+        for prompt, key, reason in zip(prompts, keys, skipped):
+            if reason:
+                output.append(f" {prompt}: skipped ({reason})\n")
+                continue
+
+            command = cached[key]
+            hit = command is not None
+            if not hit:
+                command = fetched[key]
+            if not command or is_invalid_response(command, _INVALID_CMD_RE):
+                output.append(f" {prompt}: there is no command for this!\n")
+                continue
+
+            results.append((prompt, command, None if hit or no_cache else key))
+            output.append(f" {prompt}: {command}\n")
+
+        output.append("\n")
+        sys.stdout.write(''.join(output))
+        if results and cmd.record_prompt_results(conn, cursor, results) is False:
+            print("Error 1008 Failed to add command to history")
 
-            else:
-                print("\nPlease type in more than two words.\n")
+    @staticmethod
+    def batch_lookup_group(self, client, prompts):
+        if len(prompts) == 1:
+            return [self.batch_lookup(self, client, prompts[0])]
+
+        import openai
+        try:
+            numbered = '\n'.join(f"{number}. {prompt}" for number, prompt in enumerate(prompts, 1))
+            # No stop sequence: blank lines between numbered answers must not end the reply.
+            reply = self.complete(self, client, SYSTEM_LOOKUP_BATCH, numbered, 32 * len(prompts), stop=None)
+        except openai.OpenAIError as e:
+            print(f"Error 1010: OpenAI API error occurred: {e}. Please double check your API Key.")
+            return [None] * len(prompts)
+
+        # A cut-off grouped reply is discarded and its prompts asked for one by one.
+        answers = {} if reply is None else \
+            {int(number): command for number, command in _BATCH_ANSWER_RE.findall(reply)
+             if not _BATCH_NUMBER_RE.match(command)}
+        # Prompts the grouped reply missed are asked for on their own.
+        return [answers.get(number) or self.batch_lookup(self, client, prompt)
+                for number, prompt in enumerate(prompts, 1)]
 
     @staticmethod
-    def color_query(self, prompt, api_key):
+    def batch_lookup(self, client, prompt):
+        import openai
         try:
+            command = self.complete(self, client, SYSTEM_LOOKUP, prompt, 32, _INVALID_CMD_RE, True)
+            if command is None:
+                print(f"Error 1022: The reply for '{prompt}' was cut off at the token limit.")
+            return command
+        except openai.OpenAIError as e:
+            print(f"Error 1010: OpenAI API error occurred: {e}. Please double check your API Key.")
+        return None
+
+    @staticmethod
+    def resolve_client(self, api_key):
+        client = _clients.get(api_key)
+        if client is None:
             if helpers.validate_api_key(self, api_key) is False:
-                print("Error 1009: API key is invalid or missing")
-                exit()
+                return None
+            # The SDK pulls in httpx and pydantic, so it is only imported
+            # once a lookup needs a client.
+            import httpx
+            from openai import OpenAI
+            client = _clients[api_key] = OpenAI(
+                api_key=api_key, timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+                max_retries=MAX_RETRIES)
+        return client
 
-            prompt = prompt
-            print("Getting color code...\n")
-
-            response = openai.Completion.create(
-                engine='text-davinci-003',
-                prompt=f"What is the HEX code for this color, return code only: {prompt}",
-                max_tokens=70,
-                n=1,
-                stop=None,
-                temperature=0.7)
-            response = response.choices[0].text.strip()
-            return response
+    @staticmethod
+    def warm_up(self, client):
+        # Opens the TLS connection to OpenAI while the user is still typing,
+        # so the lookup that follows reuses it from the client's pool.
+        def request():
+            try:
+                client.with_options(max_retries=0).models.retrieve(MODEL)
+            except Exception:
+                pass
 
-        except openai.error.OpenAIError as e:
-            print(f"Error 1010: OpenAI API error occurred: {e}. Please double check your API Key.")
-        except Exception as e:
-            print(f"Error 1011: Unhandled exception occurred: {e}")
+        threading.Thread(target=request, daemon=True).start()
+
+    @staticmethod
+    def complete(self, client, system, prompt, max_tokens, invalid_re=None, single_line=False, stop=("\n\n",)):
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=max_tokens,
+            n=1,
+            stop=list(stop) if stop else None,
+            temperature=TEMPERATURE,
+            seed=SEED,
+            stream=True)
+
+        text = ''
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            if chunk.choices[0].finish_reason == 'length':
+                # The reply hit max_tokens, so what arrived is incomplete.
+                return None
+            if chunk.choices[0].delta.content is None:
+                continue
+            text += chunk.choices[0].delta.content
+            if single_line and '\n' in text and '\n' in _CODE_FENCE_RE.sub('', text).lstrip():
+                # A one-line answer is complete at its first line break.
+                stream.response.close()
+                break
+            if invalid_re is None:
+                continue
+
+            opening = text.lstrip()
+            if invalid_re.match(opening) is not None:
+                # The reply is a refusal, stop generating the rest of it.
+                stream.response.close()
+                break
+            if len(opening) >= _REFUSAL_PREFIX_CHARS:
+                # The opening is not a refusal, no need to check it again.
+                invalid_re = None
+
+        text = text.strip()
+        if '```' in text:
+            text = _CODE_FENCE_RE.sub('', text).strip()
+        return text.partition('\n')[0] if single_line else text
+
+    def prompt_sql(self, conn, cursor, api_key, no_copy, no_cache=False):
+        self.run_generation(conn, cursor, api_key, no_copy, 'sql', no_cache)
+
+    def prompt_color(self, conn, cursor, api_key, no_copy, no_cache=False):
+        self.run_generation(conn, cursor, api_key, no_copy, 'color', no_cache)
 
     @staticmethod
     def port_lookup(self, api_key):
+        import openai
         try:
-            if helpers.validate_api_key(self, api_key) is False:
+            client = lookup.resolve_client(self, api_key)
+            if client is None:
                 print("Error 1009: API key is invalid or missing")
                 exit()
-            prompt = helpers.clear_input(self, input("Port: "))
-            prompt = prompt
-
-            response = openai.Completion.create(
-                engine='text-davinci-003',
-                # prompt=f"What is this port, return port meaning only: {prompt}",
-                prompt=f"lookup this port: {prompt}",
-                max_tokens=70,
-                n=1,
-                stop=None,
-                temperature=0.7)
-            response = response.choices[0].text
-            print(response)
-
-        except openai.error.OpenAIError as e:
+            lookup.warm_up(self, client)
+            ports = input("Port: ").replace(',', ' ').split()
+            if not ports:
+                print("Please enter a correct port number.")
+                return
+
+            # Several ports are looked up at the same time instead of one after another.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+                responses = pool.map(
+                    lambda port: lookup.complete(self, client, SYSTEM_PORT, port, 24, None, True), ports)
+                replies = [response if response is not None else
+                           "Error 1022: The reply was cut off at the token limit." for response in responses]
+            if len(ports) == 1:
+                sys.stdout.write(f"{replies[0]}\n")
+            else:
+                # Each answer is labelled with its port, as batch lookups are with their prompt.
+                sys.stdout.write(''.join(f" {port}: {reply}\n" for port, reply in zip(ports, replies)))
+
+        except openai.OpenAIError as e:
             print(f"Error 1010: OpenAI API error occurred: {e}. Please double check your API Key.")
         except Exception as e:
             print(f"Error 1011: Unhandled exception occurred: {e}")
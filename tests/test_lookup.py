@@ -0,0 +1,64 @@
+import unittest
+from types import SimpleNamespace
+
+from chatcmd.lookup import Lookup, SYSTEM_LOOKUP_BATCH
+
+
+def _chunk(content, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content),
+                                                    finish_reason=finish_reason)])
+
+
+class _FakeStream:
+
+    def __init__(self, text):
+        self.response = SimpleNamespace(close=lambda: None)
+        self.chunks = [_chunk(text), _chunk(None, 'stop')]
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+class _FakeClient:
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return _FakeStream(self.replies[kwargs['messages'][-1]['content']])
+
+
+class BatchLookupGroupTest(unittest.TestCase):
+
+    def test_empty_numbered_answer_does_not_take_the_next_line(self):
+        prompts = ["show something odd", "show disk usage", "show running processes"]
+        numbered = "1. show something odd\n2. show disk usage\n3. show running processes"
+        client = _FakeClient({
+            numbered: "1.\n2. du -sh .\n3. ps aux",
+            "show something odd": "uname -a",
+        })
+
+        commands = Lookup.batch_lookup_group(Lookup, client, prompts)
+
+        self.assertEqual(commands, ["uname -a", "du -sh .", "ps aux"])
+        self.assertEqual(client.requests[0]['messages'][0]['content'], SYSTEM_LOOKUP_BATCH)
+        # Only the empty answer is asked for again.
+        self.assertEqual(len(client.requests), 2)
+
+    def test_answer_starting_with_a_number_is_treated_as_empty(self):
+        prompts = ["show something odd", "show disk usage"]
+        client = _FakeClient({
+            "1. show something odd\n2. show disk usage": "1. 2. du -sh .\n2. du -sh .",
+            "show something odd": "uname -a",
+        })
+
+        commands = Lookup.batch_lookup_group(Lookup, client, prompts)
+
+        self.assertEqual(commands, ["uname -a", "du -sh ."])
+
+
+if __name__ == '__main__':
+    unittest.main()